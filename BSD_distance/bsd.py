@@ -5,36 +5,65 @@ Depending on the overlap of the leaf sets of the two trees, it calculates either
 
 import argparse
 from ete3 import Tree
-from itertools import combinations
 import math
+import numpy as np
 
 # Step 1: Parsing and Initial Analysis
 def parse_newick(newick_str):
     return Tree(newick_str, format=1)
 
-def find_common_leaves(tree1, tree2):
-    leaves1 = set(leaf.name for leaf in tree1.get_leaves())
-    leaves2 = set(leaf.name for leaf in tree2.get_leaves())
-    return leaves1.intersection(leaves2)
-
 # Step 2: Distance Calculations
+def postorder(tree):
+    # Same order as tree.traverse("postorder"), without ete3's per-node exception handling
+    stack = [(tree, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node.children and not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in reversed(node.children))
+        else:
+            yield node
+
 def calculate_pairwise_distances(tree, leaves):
-    distances = {}
-    for leaf1, leaf2 in combinations(leaves, 2):
-        distance = tree.get_distance(leaf1, leaf2)
-        distances[(leaf1, leaf2)] = distance
-    return distances
+    # Distance matrix of the given leaves, filled at each LCA as depth1 + depth2 - 2 * depth(LCA)
+    index_map = {name: i for i, name in enumerate(sorted(leaves))}
+    distances = np.zeros((len(index_map), len(index_map)))
+    leaf_depths = np.zeros(len(index_map))
+
+    node_depths = {}
+    for node in tree.traverse("preorder"):
+        node_depths[node] = node_depths[node.up] + node.dist if node.up else 0.0
+
+    groups = {}
+    for node in postorder(tree):
+        if node.is_leaf():
+            i = index_map.get(node.name)
+            if i is None:
+                groups[node] = []
+            else:
+                leaf_depths[i] = node_depths[node]
+                groups[node] = [i]
+            continue
+        merged = []
+        for child in node.children:
+            group = groups.pop(child)
+            if merged and group:
+                block = leaf_depths[merged][:, None] + leaf_depths[group][None, :] - 2 * node_depths[node]
+                distances[np.ix_(merged, group)] = block
+                distances[np.ix_(group, merged)] = block.T
+            merged.extend(group)
+        groups[node] = merged
+    if sum(len(group) for group in groups.values()) != len(index_map):
+        raise ValueError("Some of the leaves were not found in the tree.")
+    return index_map, distances
 
 # Step 3: Calculate the Branch Score Distance (BSD)
 def calculate_BSD(tree1, tree2, leaves):
-    def squared_distance_sum(t1, t2, leaves):
-        sum_sq_distance = 0
-        for leaf1, leaf2 in combinations(leaves, 2):
-            d1 = t1.get_distance(leaf1, leaf2)
-            d2 = t2.get_distance(leaf1, leaf2)
-            sum_sq_distance += (d1 - d2) ** 2
-        return sum_sq_distance
-    return math.sqrt(squared_distance_sum(tree1, tree2, leaves))
+    # Same sorted leaf order in both matrices; the symmetric difference counts each pair twice
+    _, d1 = calculate_pairwise_distances(tree1, leaves)
+    _, d2 = calculate_pairwise_distances(tree2, leaves)
+    d1 -= d2
+    return math.sqrt(np.vdot(d1, d1) / 2)
 
 # Function to prune a tree to only contain common leaves
 def prune_to_common_leaves(tree, common_leaves):
@@ -52,15 +81,15 @@ def main(input_file, output_file):
 
     tree1 = trees[0]
     tree2 = trees[1]
-    common_leaves = find_common_leaves(tree1, tree2)
+    # Leaf sets of both trees, used for the common leaves and to choose between BSD and BSD(-)
+    leaves1 = set(tree1.get_leaf_names())
+    leaves2 = set(tree2.get_leaf_names())
+    common_leaves = leaves1.intersection(leaves2)
 
     if not common_leaves:
         print("The BSD distance between input trees cannot be computed because these trees have no common leaves.")
         return
 
-    leaves1 = set(leaf.name for leaf in tree1.get_leaves())
-    leaves2 = set(leaf.name for leaf in tree2.get_leaves())
-
     with open(output_file, 'w') as out:
         if leaves1 == leaves2:
             # Calculate BSD
@@ -18,39 +18,24 @@ def find_maximal_distinct_subtrees(tree, distinct_leaves):
     for node in tree.traverse("postorder"):
         precompute_descendants(node, distinct_leaves)
 
+    # Stop descending at all-distinct nodes: those are exactly the maximal roots
     subtree_roots = set()
-    visited_leaves = set()
-
-    for leaf_name in distinct_leaves:
-        if leaf_name in visited_leaves:
-            continue
-
-        leaf_node = tree&leaf_name
-        current_node = leaf_node
-        subtree_root = None
-
-        while current_node:
-            if current_node.descendants_distinct:
-                subtree_root = current_node
-            current_node = current_node.up
-
-        if subtree_root and subtree_root not in subtree_roots:
-            subtree_roots.add(subtree_root)
-            visited_leaves.update(get_leaves(subtree_root))
+    for node in tree.traverse("preorder", is_leaf_fn=lambda n: n.descendants_distinct):
+        if node.descendants_distinct:
+            subtree_roots.add(node)
 
     return subtree_roots
 
-def get_leaves(node):
-    return set(leaf.name for leaf in node)
-
 def get_subtree_newick_with_branch_lengths(node):
-    def recursive_newick(node):
-        if node.is_leaf():
-            return f"{node.name}:{node.dist}"
-        children_newick = [recursive_newick(child) for child in node.children]
-        return f"({','.join(children_newick)}):{node.dist}"
-
-    return recursive_newick(node)
+    # Built in one postorder pass to stay clear of the recursion limit
+    fragments = {}
+    for current in node.traverse("postorder"):
+        if current.is_leaf():
+            fragments[current] = f"{current.name}:{current.dist}"
+        else:
+            children_newick = [fragments.pop(child) for child in current.children]
+            fragments[current] = f"({','.join(children_newick)}):{current.dist}"
+    return fragments[node]
 
 # Example
 
@@ -20,28 +20,18 @@ def find_path(leaf1, leaf2):
     while node:
         path1.append(node)
         node = node.up
-    
+
+    # Walk up from leaf2 until it meets the root path of leaf1
+    ancestors1 = set(path1)
     path2 = []
     node = leaf2
-    while node:
+    while node not in ancestors1:
         path2.append(node)
         node = node.up
+    lca = node
 
-    # Find the common ancestor
-    lca = None
-    for n1 in path1:
-        if n1 in path2:
-            lca = n1
-            break
-    
-    path = []
-    for node in path1:
-        path.append(node)
-        if node == lca:
-            break
-    
-    lca_index = path2.index(lca)
-    path.extend(reversed(path2[:lca_index]))
+    path = path1[:path1.index(lca) + 1]
+    path.extend(reversed(path2))
     
     path_names = [n.name for n in path]
     print(f"Diameter path: {' -> '.join(path_names)}")
@@ -145,32 +135,21 @@ def find_path(leaf1, leaf2):
         path1.append(node)
         node = node.up
 
+    ancestors1 = set(path1)
     path2 = []
     node = leaf2
-    while node:
+    while node not in ancestors1:
         path2.append(node)
         node = node.up
+    lca = node
 
-    # Find the common ancestor
-    lca = None
-    for n1 in path1:
-        if n1 in path2:
-            lca = n1
-            break
-
-    path = []
-    branch_lengths = []
-    for node in path1:
-        path.append(node)
-        if node == lca:
-            break
+    lca_index = path1.index(lca)
+    path = path1[:lca_index + 1]
+    path.extend(reversed(path2))
 
-    lca_index = path2.index(lca)
-    reversed_path2 = list(reversed(path2[:lca_index]))
-    path.extend(reversed_path2)
-
-    for i in range(1, len(path)):
-        branch_lengths.append(path[i - 1].get_distance(path[i]))
+    # Each branch length is the dist of the lower node of the pair
+    branch_lengths = [node.dist for node in path1[:lca_index]]
+    branch_lengths.extend(node.dist for node in reversed(path2))
 
     path_names = [n.name for n in path]
     print(f"Diameter path: {' -> '.join(path_names)}")
@@ -218,8 +197,10 @@ def insert_midpoint_and_new_leaf(tree, prev_node, curr_node, excess, new_leaf_na
         print(f"Added new leaf '{new_leaf_name}' to node '{curr_node.name}' with distance {new_leaf.dist}")
         return tree
 
+    curr_is_parent = prev_node.up is curr_node
+
     # Calculate distances
-    if curr_node in prev_node.get_ancestors():
+    if curr_is_parent:
         distance_to_midpoint = round(excess, 10)
         distance_from_midpoint_to_leaf = round(original_dist - excess, 10)
     else:
@@ -235,7 +216,7 @@ def insert_midpoint_and_new_leaf(tree, prev_node, curr_node, excess, new_leaf_na
     new_node = Tree(name="midpoint")
     new_node.dist = distance_to_midpoint
 
-    if curr_node in prev_node.get_ancestors():
+    if curr_is_parent:
         parent = prev_node.up
         child = prev_node
     else:
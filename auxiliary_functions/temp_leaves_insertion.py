@@ -1,455 +1,238 @@
 # Temporary leaf insertion
 # Make sure you have ete3 installed
 
+from collections import deque
 from ete3 import Tree
 
-def InsertTempLeaves(newick, target_leaf, new_leaf_base_name, new_length, dist, tolerance=1e-10):
-    tree = Tree(newick, format=1)
-    target_node = tree.search_nodes(name=target_leaf)[0]
-    insertion_points = []
-    visited_nodes = set()
-
-    # Label internal nodes and branches for easier tracking
-    internal_node_counter = 1
-    for node in tree.traverse("postorder"):
-        if not node.is_leaf() and not node.name:
-            node.name = f"Node{internal_node_counter}"
-            internal_node_counter += 1
-
-    def robust_insert_leaf_at_node(current_node, insert_distance, previous_node, original_branch_distance, toward_root=False):
-        excess_length = original_branch_distance - insert_distance
-
-        if excess_length < 0:
-            excess_length = 0
-
-        # Handle traversal toward the root by ensuring correct branch selection
-        if toward_root:
-            temp = current_node
-            current_node = previous_node
-            previous_node = temp
-
-        # Detach the previous node from its parent (the node leading to the root)
-        parent = previous_node.up
-        if parent:
-            previous_node.detach()
-
-        if parent is None:
-            new_internal_node = tree.add_child(dist=excess_length)
-            current_node.detach()
-            new_internal_node.add_child(current_node, dist=insert_distance)
-            new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(new_internal_node)
-            visited_nodes.add(new_internal_node)
-            visited_nodes.add(new_leaf_name)
-        else:
-            new_internal_node = parent.add_child(dist=excess_length)
-            new_internal_node.add_child(previous_node, dist=insert_distance)
-            new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(new_internal_node)
-            visited_nodes.add(new_internal_node)
-
-        # Post-insertion validation
-        correct_insertion = validate_insertion_path(current_node, new_internal_node, previous_node, original_branch_distance)
-        if not correct_insertion:
-            print(f"Error: Insertion point verification failed between '{previous_node.name}' and '{current_node.name}'")
-        return correct_insertion
-
-    def insert_leaf_at_terminal(current_node, insert_distance):
-        excess_length = current_node.dist - insert_distance
-        if excess_length < 0:
-            excess_length = 0
-
-        parent = current_node.up
-        if parent:
-            current_node.detach()
-            new_internal_node = parent.add_child(dist=excess_length)
-            new_internal_node.add_child(current_node, dist=insert_distance)
-            new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(new_internal_node)
-            visited_nodes.add(new_internal_node)
-            visited_nodes.add(new_leaf_name)
-        else:
-            return False
-
-        return True
-
-    def bfs(node, accumulated_distance):
-        queue = [(node, accumulated_distance, None, 0, [], False)]
-        while queue:
-            current_node, current_dist, prev_node, prev_dist, path, toward_root = queue.pop(0)
-            if current_node in visited_nodes:
-                continue
-            visited_nodes.add(current_node)
-            current_path = path + [current_node.name]
-
-            if round(current_dist, 8) >= dist:
-                insert_distance = round(current_dist, 8) - round(dist, 8)
-                if abs(insert_distance) < tolerance:
-                    insert_distance = 0
-                if insert_distance == 0:
-                    if not robust_insert_leaf_at_node(current_node, insert_distance, prev_node, current_node.dist, toward_root):
-                        return
-                elif current_node.is_leaf():
-                    if not insert_leaf_at_terminal(current_node, insert_distance):
-                        return
-                else:
-                    if not robust_insert_leaf_at_node(prev_node, prev_dist - insert_distance, current_node, prev_dist, toward_root):
-                        return
-                continue
-
-            for child in current_node.children:
-                if child not in visited_nodes:
-                    queue.append((child, current_dist + child.dist, current_node, child.dist, current_path, False))
-
-            if current_node.up and current_node.up not in visited_nodes:
-                queue.append((current_node.up, current_dist + current_node.dist, current_node, current_node.dist, current_path, True))
-
-    def validate_insertion_path(current_node, new_internal_node, previous_node, original_branch_distance):
-        # Verifies if the insertion happened between the correct nodes
-        distance_check = current_node.get_distance(new_internal_node) + new_internal_node.get_distance(previous_node)
-        return abs(distance_check - original_branch_distance) < tolerance
-
-    if dist <= target_node.dist:
-        insert_leaf_at_terminal(target_node, dist)
-    else:
-        bfs(target_node, 0)
-
-    if insertion_points:
-        print(tree.write(format=1))
-        print(tree)
-    else:
-        print("No valid insertion points were found based on the specified distance.")
-
-# Example
-newick = "(((A:1.587,(F:1.110,(M:1.343,R:1.369):0.846):0.487):1.981,D:0.356):2.121,(B:1.936,(C:0.915,Q:1.201):2.101):0.912);"
-target_leaf = "Q"
-new_leaf_base_name = "temp"
-new_length = 0.279
-dist = 3.0597060866386405
-
-InsertTempLeaves(newick, target_leaf, new_leaf_base_name, new_length, dist)
-# Debugging
-
-from ete3 import Tree
-
-def insert_leaf_from_target(newick, target_leaf, new_leaf_base_name, new_length, dist, tolerance=1e-10):
-    tree = Tree(newick, format=1)
-    target_node = tree.search_nodes(name=target_leaf)[0]
-    insertion_points = []  # Store nodes where inserts will be made
-    visited_nodes = set()  # Set to track visited nodes
-
-    # Label internal nodes for easier tracking
+def _prepare(tree):
+    # Label internal nodes and index the tree once, shared by all insertions on the same tree
+    name_index = {}
+    temporary_leaves = set()  # leaves inserted so far, never walked into by later insertions
+    heights = {}  # distance from each node to its farthest descendant leaf
+    nodes = list(tree.traverse("postorder"))  # every node of the tree, inserted ones are appended
     internal_node_counter = 1
-    for node in tree.traverse("postorder"):
-        if not node.is_leaf() and not node.name:
+    for node in nodes:
+        children = node.children
+        if not children:
+            name_index[node.name] = node
+            heights[node] = 0.0
+            continue
+        if not node.name:
             node.name = f"Node{internal_node_counter}"
             internal_node_counter += 1
+        heights[node] = max(child.dist + heights[child] for child in children)
+    return name_index, heights, temporary_leaves, nodes
 
-    def insert_leaf_at_node(parent_node, insert_distance, previous_node):
-        print(f"Attempting to insert at node '{parent_node.name}' with insert distance {insert_distance}, coming from '{previous_node.name if previous_node else 'None'}'")
-        if abs(insert_distance) < tolerance:
-            new_leaf_name = f"{new_leaf_base_name}{len(insertion_points) + 1}"
-            parent_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(parent_node)
-            visited_nodes.add(parent_node)
-            visited_nodes.add(new_leaf_name)
-            print(f"Inserted '{new_leaf_name}' at existing node '{parent_node.name}' with no new internal node.")
-        else:
-            excess_length = parent_node.dist - insert_distance
-            if excess_length < 0:
-                print(f"Invalid insertion leading to negative branch length: {excess_length}")
-                return False
-
-            if parent_node.up:
-                new_internal_node = parent_node.up.add_child(dist=excess_length)
-                parent_node.detach()
-                new_internal_node.add_child(parent_node, dist=insert_distance)
-                new_leaf_name = f"{new_leaf_base_name}{len(insertion_points) + 1}"
-                new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-                insertion_points.append(new_internal_node)
-                visited_nodes.add(new_internal_node)
-                visited_nodes.add(new_internal_node.children[1])  # Newly added leaf node
-                # Swap the assigned lengths
-                print(f"Inserted '{new_leaf_name}' between '{parent_node.name}' and '{parent_node.up.name}' with insert distance {insert_distance} and excess length {excess_length}")
-            else:
-                # Handling the case when the parent node is the root
-                new_internal_node = tree.add_child(dist=excess_length)
-                parent_node.detach()
-                new_internal_node.add_child(parent_node, dist=insert_distance)
-                new_leaf_name = f"{new_leaf_base_name}{len(insertion_points) + 1}"
-                new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-                insertion_points.append(new_internal_node)
-                visited_nodes.add(new_internal_node)
-                visited_nodes.add(new_internal_node.children[1])  # Newly added leaf node
-                print(f"Inserted '{new_leaf_name}' at root between '{parent_node.name}' and the root with insert distance {insert_distance} and excess length {excess_length}")
-            return True
-
-    def bfs_case_1(node, accumulated_distance):
-        queue = [(node, accumulated_distance, None, 0, [])]
-        while queue:
-            current_node, current_dist, prev_node, prev_dist, path = queue.pop(0)
-            if current_node in visited_nodes:
-                continue
-            visited_nodes.add(current_node)
-            current_path = path + [current_node.name]
-
-            print(f"Traversing '{current_node.name}' with accumulated distance: {current_dist}. Path: {' -> '.join(current_path)}")
-            if round(current_dist, 8) >= dist:
-                insert_distance = round(current_dist, 8) - round(dist, 8)
-                if abs(insert_distance) < tolerance:
-                    insert_distance = 0
-                if insert_distance == 0:
-                    # Insert leaf directly at the current node
-                    if not insert_leaf_at_node(current_node, insert_distance, prev_node):
-                        return
-                elif current_node.is_leaf():
-                    # Insert new leaf at the correct branch between the node and its parent
-                    if not insert_leaf_at_node(current_node, insert_distance, prev_node):
-                        return
-                else:
-                    # Insert new leaf at the correct branch between the previous node and the current node
-                    print(f"Checking insertion between previous node '{prev_node.name if prev_node else 'None'}' and current node '{current_node.name}' with distances {prev_dist} - {insert_distance}")
-                    if not insert_leaf_at_node(current_node, insert_distance, prev_node):
-                        return
-                continue
-
-            # Traverse children
-            for child in current_node.children:
-                if child not in visited_nodes:  # Avoid traversing newly added leaves
-                    queue.append((child, current_dist + child.dist, current_node, child.dist, current_path))
-
-            # Traverse parent
-            if current_node.up and current_node.up not in visited_nodes:  # Avoid traversing newly added internal nodes
-                queue.append((current_node.up, current_dist + current_node.dist, current_node, current_node.dist, current_path))
-
-    def bfs_case_2(node, accumulated_distance):
-        # BFS traversal with a focus on trees where the leaf is on a different side of the root
-        queue = [(node, accumulated_distance, None, 0, [])]
-        while queue:
-            current_node, current_dist, prev_node, prev_dist, path = queue.pop(0)
-            if current_node in visited_nodes:
-                continue
-            visited_nodes.add(current_node)
-            current_path = path + [current_node.name]
-
-            print(f"Traversing '{current_node.name}' with accumulated distance: {current_dist}. Path: {' -> '.join(current_path)}")
-            if round(current_dist, 8) >= dist:
-                insert_distance = round(current_dist, 8) - round(dist, 8)
-                if abs(insert_distance) < tolerance:
-                    insert_distance = 0
-                if insert_distance == 0:
-                    # Insert leaf directly at the current node
-                    if not insert_leaf_at_node(current_node, insert_distance, prev_node):
-                        return
-                elif current_node.is_leaf():
-                    # Insert new leaf at the correct branch between the node and its parent
-                    if not insert_leaf_at_node(current_node, insert_distance, prev_node):
-                        return
-                else:
-                    # Insert new leaf at the correct branch between the previous node and the current node
-                    print(f"Checking insertion between previous node '{prev_node.name if prev_node else 'None'}' and current node '{current_node.name}' with distances {prev_dist} - {insert_distance}")
-                    if not insert_leaf_at_node(prev_node, prev_dist - insert_distance, current_node):
-                        return
-                continue
-
-            # Traverse children
-            for child in current_node.children:
-                if child not in visited_nodes:  # Avoid traversing newly added leaves
-                    queue.append((child, current_dist + child.dist, current_node, child.dist, current_path))
-
-            # Traverse parent
-            if current_node.up and current_node.up not in visited_nodes:  # Avoid traversing newly added internal nodes
-                queue.append((current_node.up, current_dist + current_node.dist, current_node, current_node.dist, current_path))
-
-    # Direct insertion case when dist is less than the terminal branch length of the target leaf
-    if dist <= target_node.dist:
-        print(f"Direct insertion at target leaf '{target_leaf}' with distance {dist}")
-        insert_leaf_at_node(target_node, dist, target_node)
-    else:
-        # Determine which BFS method to use based on tree topology
-        if tree.get_distance(tree.get_tree_root(), target_node) < tree.get_farthest_leaf()[1] / 2:
-            bfs_case_1(target_node, 0)
-        else:
-            bfs_case_2(target_node, 0)
-
-    # Round the final output distances for better readability
-    def round_tree_distances(tree_node, decimals=8):
-        for node in tree_node.traverse():
-            node.dist = round(node.dist, decimals)
-
-    round_tree_distances(tree)
-
-    # Output the final results
-    if insertion_points:
-        print("Final tree with all inserted leaves:")
-        print(tree.write(format=1))
-        print(tree)
-    else:
-        print("No valid insertion points were found based on the specified distance.")
-
-# Example
-newick = "(((A:1.587,(F:1.110,(M:1.343,R:1.369):0.846):0.487):1.981,D:0.356):2.121,(B:1.936,(C:0.915,Q:1.201):2.101):0.912);"
-target_leaf = "D"
-new_leaf_base_name = "E"
-new_length = 0.279
-dist = 2.695936081694403
-
-print(Tree(newick, format=1))
-# Insert new leaves and check the tree structure
-insert_leaf_from_target(newick, target_leaf, new_leaf_base_name, new_length, dist)
-print(Tree(newick, format=1))
-
-# Updated traversal case
-from ete3 import Tree
-
-def insert_leaf_from_target(newick, target_leaf, new_leaf_base_name, new_length, dist, tolerance=1e-10):
-    tree = Tree(newick, format=1)
-    target_node = tree.search_nodes(name=target_leaf)[0]
+def _insert_one(tree, prep, target_leaf, new_leaf_base_name, new_length, dist, tolerance=1e-10, debug=False):
+    name_index, heights, temporary_leaves, nodes = prep
+    target_node = name_index[target_leaf]
     insertion_points = []
-    visited_nodes = set()
-
-    # Label internal nodes and branches for easier tracking
-    internal_node_counter = 1
-    for node in tree.traverse("postorder"):
-        if not node.is_leaf() and not node.name:
-            node.name = f"Node{internal_node_counter}"
-            internal_node_counter += 1
+    inserted_nodes = set()
+    name_prefix = f"{target_leaf}_{new_leaf_base_name}"
+
+    def reachable_radius(node):
+        # Farthest distance reachable from node, either down its subtree or up through its ancestors
+        radius = heights[node]
+        up_distance = 0.0
+        while node.up:
+            up_distance += node.dist
+            for sibling in node.up.children:
+                if sibling is not node:
+                    radius = max(radius, up_distance + sibling.dist + heights[sibling])
+            node = node.up
+        return radius
+
+    def register_leaf(new_internal_node, new_leaf):
+        # Keep the index and the heights valid for later insertions on the same tree
+        name_index[new_leaf.name] = new_leaf
+        heights[new_leaf] = 0.0
+        temporary_leaves.add(new_leaf)
+        nodes.append(new_internal_node)
+        nodes.append(new_leaf)
+        node = new_internal_node
+        while node:
+            heights[node] = max(child.dist + heights[child] for child in node.children)
+            node = node.up
+
+    def splice_leaf_above(node, dist_above, dist_below):
+        # Split the branch above node in place, the new node taking node's slot in its parent
+        parent = node.up
+        new_internal_node = Tree(dist=dist_above)
+        parent.children[parent.children.index(node)] = new_internal_node
+        new_internal_node.up = parent
+        node.up = new_internal_node
+        node.dist = dist_below
+        new_leaf_name = name_prefix + str(len(insertion_points) + 1)
+        new_leaf = Tree(name=new_leaf_name, dist=new_length)
+        new_leaf.up = new_internal_node
+        new_internal_node.children = [node, new_leaf]
+        register_leaf(new_internal_node, new_leaf)
+        insertion_points.append(new_internal_node)
+        inserted_nodes.add(new_internal_node)
+        return new_internal_node, new_leaf_name
 
     def robust_insert_leaf_at_node(current_node, insert_distance, previous_node, original_branch_distance, toward_root=False):
-        print(f"\nAttempting insertion between nodes:")
-        print(f"Current node: {current_node.name}")
-        print(f"Previous node: {previous_node.name}")
-        print(f"Original branch distance: {original_branch_distance}")
-        print(f"Insertion distance: {insert_distance}")
+        if debug:
+            print(f"\nAttempting insertion between nodes:")
+            print(f"Current node: {current_node.name}")
+            print(f"Previous node: {previous_node.name}")
+            print(f"Original branch distance: {original_branch_distance}")
+            print(f"Insertion distance: {insert_distance}")
 
         excess_length = original_branch_distance - insert_distance
-        print(f"Calculated excess length: {excess_length}")
+        if debug:
+            print(f"Calculated excess length: {excess_length}")
 
         if excess_length < 0:
             excess_length = 0
 
         # Handle traversal toward the root by ensuring correct branch selection
         if toward_root:
-            print("Handling traversal toward the root...")
-            temp = current_node
-            current_node = previous_node
-            previous_node = temp
-
-        # Detach the previous node from its parent (the node leading to the root)
-        parent = previous_node.up
-        if parent:
-            previous_node.detach()
-
-        if parent is None:
-            print("Handling root case")
-            new_internal_node = tree.add_child(dist=excess_length)
-            current_node.detach()
-            new_internal_node.add_child(current_node, dist=insert_distance)
-            new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(new_internal_node)
-            visited_nodes.add(new_internal_node)
-            visited_nodes.add(new_leaf_name)
+            if debug:
+                print("Handling traversal toward the root...")
+            current_node, previous_node = previous_node, current_node
+
+        # Split the branch above the previous node, or above the current node when the previous one is the root
+        if previous_node.up is None:
+            if debug:
+                print("Handling root case")
+            new_internal_node, new_leaf_name = splice_leaf_above(current_node, excess_length, insert_distance)
         else:
-            print(f"Normal case: Adding new internal node between '{previous_node.name}' and its parent.")
-            #new_internal_node = parent.add_child(dist=insert_distance)
-            #new_internal_node.add_child(previous_node, dist=excess_length)
-            new_internal_node = parent.add_child(dist=excess_length)
-            new_internal_node.add_child(previous_node, dist=insert_distance)
-            new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(new_internal_node)
-            visited_nodes.add(new_internal_node)
-            print(f"Inserted leaf '{new_leaf_name}' between '{previous_node.name}' and '{current_node.name}'")
-
-        # Post-insertion validation
+            if debug:
+                print(f"Normal case: Adding new internal node between '{previous_node.name}' and its parent.")
+            new_internal_node, new_leaf_name = splice_leaf_above(previous_node, excess_length, insert_distance)
+            if debug:
+                print(f"Inserted leaf '{new_leaf_name}' between '{previous_node.name}' and '{current_node.name}'")
+
+        # Post-insertion validation, only when debugging
+        if not debug:
+            return True
         correct_insertion = validate_insertion_path(current_node, new_internal_node, previous_node, original_branch_distance)
         if not correct_insertion:
             print(f"Error: Insertion point verification failed between '{previous_node.name}' and '{current_node.name}'")
         return correct_insertion
 
     def insert_leaf_at_terminal(current_node, insert_distance):
-        print(f"\nInserting at terminal node '{current_node.name}' with insert distance {insert_distance}")
+        if current_node in temporary_leaves:
+            return False
+        if debug:
+            print(f"\nInserting at terminal node '{current_node.name}' with insert distance {insert_distance}")
         excess_length = current_node.dist - insert_distance
-        print(f"Terminal node excess length: {excess_length}")
+        if debug:
+            print(f"Terminal node excess length: {excess_length}")
         if excess_length < 0:
             excess_length = 0
 
-        parent = current_node.up
-        if parent:
-            current_node.detach()
-            new_internal_node = parent.add_child(dist=excess_length)
-            new_internal_node.add_child(current_node, dist=insert_distance)
-            new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
-            insertion_points.append(new_internal_node)
-            visited_nodes.add(new_internal_node)
-            visited_nodes.add(new_leaf_name)
-            print(f"Inserted '{new_leaf_name}' at terminal node '{current_node.name}' with insert distance {insert_distance} and excess length {excess_length}")
+        if current_node.up:
+            new_internal_node, new_leaf_name = splice_leaf_above(current_node, excess_length, insert_distance)
+            if debug:
+                print(f"Inserted '{new_leaf_name}' at terminal node '{current_node.name}' with insert distance {insert_distance} and excess length {excess_length}")
         else:
             print("Unexpected case: trying to insert at terminal root leaf.")
             return False
 
         return True
 
-    def bfs(node, accumulated_distance):
-        queue = [(node, accumulated_distance, None, 0, [], False)]
+    def insert_if_reached(current_node, current_dist, prev_node, prev_dist, toward_root):
+        # Returns None when current_node is still closer than dist, otherwise the insertion result
+        if debug:
+            print(f"\nTraversing '{current_node.name}' with accumulated distance: {current_dist}")
+        if current_dist + tolerance < dist:
+            return None
+        # Residuals below the tolerance count as an exact hit (insert_distance is never negative here)
+        insert_distance = max(0.0, current_dist - dist)
+        if insert_distance < tolerance:
+            insert_distance = 0
+        if insert_distance == 0:
+            if debug:
+                print("Direct insertion scenario triggered")
+            return robust_insert_leaf_at_node(current_node, insert_distance, prev_node, current_node.dist, toward_root)
+        if current_node.is_leaf():
+            if debug:
+                print("Leaf node insertion scenario triggered")
+            return insert_leaf_at_terminal(current_node, insert_distance)
+        if debug:
+            print(f"Checking insertion between previous node '{prev_node.name}' and current node '{current_node.name}' with distances {prev_dist} - {insert_distance}")
+        return robust_insert_leaf_at_node(prev_node, prev_dist - insert_distance, current_node, prev_dist, toward_root)
+
+    def walk_down(start_node, start_dist, came_from):
+        # Breadth-first walk into the subtrees of start_node, except the one we came from
+        queue = deque()
+        for child in start_node.children:
+            if child is not came_from and child not in inserted_nodes and child not in temporary_leaves:
+                queue.append((child, start_dist + child.dist, start_node))
         while queue:
-            current_node, current_dist, prev_node, prev_dist, path, toward_root = queue.pop(0)
-            if current_node in visited_nodes:
-                continue
-            visited_nodes.add(current_node)
-            current_path = path + [current_node.name]
-
-            print(f"\nTraversing '{current_node.name}' with accumulated distance: {current_dist}. Path: {' -> '.join(current_path)}")
-            if round(current_dist, 8) >= dist:
-                insert_distance = round(current_dist, 8) - round(dist, 8)
-                if abs(insert_distance) < tolerance:
-                    insert_distance = 0
-                if insert_distance == 0:
-                    print("Direct insertion scenario triggered")
-                    if not robust_insert_leaf_at_node(current_node, insert_distance, prev_node, current_node.dist, toward_root):
-                        return
-                elif current_node.is_leaf():
-                    print("Leaf node insertion scenario triggered")
-                    if not insert_leaf_at_terminal(current_node, insert_distance):
-                        return
-                else:
-                    print(f"Checking insertion between previous node '{prev_node.name if prev_node else 'None'}' and current node '{current_node.name}' with distances {prev_dist} - {insert_distance}")
-                    if not robust_insert_leaf_at_node(prev_node, prev_dist - insert_distance, current_node, prev_dist, toward_root):
-                        return
+            current_node, current_dist, prev_node = queue.popleft()
+            reached = insert_if_reached(current_node, current_dist, prev_node, current_node.dist, False)
+            if reached is False:
+                return False
+            if reached:
                 continue
-
             for child in current_node.children:
-                if child not in visited_nodes:
+                if child in temporary_leaves:
+                    continue
+                if debug:
                     print(f"Adding child node '{child.name}' to the queue")
-                    queue.append((child, current_dist + child.dist, current_node, child.dist, current_path, False))
+                queue.append((child, current_dist + child.dist, current_node))
+        return True
 
-            if current_node.up and current_node.up not in visited_nodes:
-                print(f"Adding parent node '{current_node.up.name}' to the queue")
-                queue.append((current_node.up, current_dist + current_node.dist, current_node, current_node.dist, current_path, True))
+    def walk_up_then_down(start_node):
+        # Record the lineage before any insertion changes the branches, up to the first ancestor at or past dist
+        lineage = []
+        node = start_node
+        accumulated = 0.0
+        while node.up:
+            accumulated += node.dist
+            lineage.append((node.up, accumulated, node, node.dist))
+            if accumulated + tolerance >= dist:
+                break
+            node = node.up
+
+        if not walk_down(start_node, 0.0, None):
+            return
+        for ancestor, ancestor_dist, hop, hop_dist in lineage:
+            reached = insert_if_reached(ancestor, ancestor_dist, hop, hop_dist, True)
+            if reached is not None:
+                return
+            if not walk_down(ancestor, ancestor_dist, hop):
+                return
+
+    def branch_distance(node1, node2):
+        # Adjacent nodes are separated by the branch of the child, no need for a full tree walk
+        if node1.up is node2:
+            return node1.dist
+        if node2.up is node1:
+            return node2.dist
+        return node1.get_distance(node2)
 
     def validate_insertion_path(current_node, new_internal_node, previous_node, original_branch_distance):
         # Verifies if the insertion happened between the correct nodes
-        print(f"Verifying insertion path...")
-        distance_check = current_node.get_distance(new_internal_node) + new_internal_node.get_distance(previous_node)
-        print(f"Verifying insertion path distance: {distance_check}, between '{previous_node.name}' and '{current_node.name}'")
+        if debug:
+            print(f"Verifying insertion path...")
+        distance_check = branch_distance(current_node, new_internal_node) + branch_distance(new_internal_node, previous_node)
+        if debug:
+            print(f"Verifying insertion path distance: {distance_check}, between '{previous_node.name}' and '{current_node.name}'")
         return abs(distance_check - original_branch_distance) < tolerance
 
     if dist <= target_node.dist:
-        print(f"\nDirect insertion at target leaf '{target_leaf}' with distance {dist}")
+        if debug:
+            print(f"\nDirect insertion at target leaf '{target_leaf}' with distance {dist}")
         insert_leaf_at_terminal(target_node, dist)
+    elif dist > reachable_radius(target_node) + tolerance:
+        # No node of the tree is that far from the target leaf, the traversal would only fail
+        if debug:
+            print(f"\nDistance {dist} exceeds the farthest distance reachable from '{target_leaf}'")
     else:
-        bfs(target_node, 0)
+        walk_up_then_down(target_node)
 
-    def round_tree_distances(tree_node, decimals=8):
-        for node in tree_node.traverse():
-            node.dist = round(node.dist, decimals)
+    return insertion_points
 
-    round_tree_distances(tree)
+def round_tree_distances(nodes, decimals=8):
+    for node in nodes:
+        node.dist = round(node.dist, decimals)
+
+def report_insertions(tree, insertion_points, nodes):
+    round_tree_distances(nodes)
 
     if insertion_points:
         print("\nFinal tree with all inserted leaves:")
@@ -458,11 +241,38 @@ def insert_leaf_from_target(newick, target_leaf, new_leaf_base_name, new_length,
     else:
         print("No valid insertion points were found based on the specified distance.")
 
-# Example
-newick = "(((A:1.587,(F:1.110,(M:1.343,R:1.369):0.846):0.487):1.981,D:0.356):2.121,(B:1.936,(C:0.915,Q:1.201):2.101):0.912);"
-target_leaf = "Q"
-new_leaf_base_name = "temp"
-new_length = 0.279
-dist = 3.0597060866386405
-
-insert_leaf_from_target(newick, target_leaf, new_leaf_base_name, new_length, dist)
+def _as_tree(tree_or_newick):
+    # A parsed tree is modified in place, pass tree.copy() to keep the original
+    if isinstance(tree_or_newick, Tree):
+        return tree_or_newick
+    return Tree(tree_or_newick, format=1)
+
+def insert_leaf_from_target(tree_or_newick, target_leaf, new_leaf_base_name, new_length, dist, tolerance=1e-10, debug=False):
+    tree = _as_tree(tree_or_newick)
+    prep = _prepare(tree)
+    insertion_points = _insert_one(tree, prep, target_leaf, new_leaf_base_name, new_length, dist, tolerance, debug)
+    report_insertions(tree, insertion_points, prep[3])
+    return tree
+
+def insert_leaves_from_targets(tree_or_newick, insertions, tolerance=1e-10, debug=False):
+    # Each insertion is a (target_leaf, new_leaf_base_name, new_length, dist) tuple
+    tree = _as_tree(tree_or_newick)
+    prep = _prepare(tree)
+    insertion_points = []
+    for target_leaf, new_leaf_base_name, new_length, dist in insertions:
+        insertion_points.extend(_insert_one(tree, prep, target_leaf, new_leaf_base_name, new_length, dist, tolerance, debug))
+    report_insertions(tree, insertion_points, prep[3])
+    return tree
+
+if __name__ == "__main__":
+    # Example
+    newick = "(((A:1.587,(F:1.110,(M:1.343,R:1.369):0.846):0.487):1.981,D:0.356):2.121,(B:1.936,(C:0.915,Q:1.201):2.101):0.912);"
+    new_length = 0.279
+    # Parse once, each example works on its own copy
+    base_tree = Tree(newick, format=1)
+
+    # Insertion reaching the other side of the root
+    insert_leaf_from_target(base_tree.copy(), "D", "E", new_length, 2.695936081694403, debug=True)
+
+    # Insertion starting from a leaf close to the root
+    insert_leaf_from_target(base_tree.copy(), "Q", "temp", new_length, 3.0597060866386405, debug=True)
@@ -7,15 +7,20 @@ Last Modified: 2024-10-25
 Description: This Python script automates the process of creating datasets of biologically meaningful partially overlapping phylogenetic trees with branch lengths.
 """
 
+import numpy as np
 import pandas as pd
 import random
 import os
 import sys
 import math
 import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import shutil
 import zipfile
 import requests
+from requests.adapters import HTTPAdapter
 from Bio import Phylo
 
 # For Selenium
@@ -66,11 +71,17 @@ def calculate_n_for_k(k, p_values=[0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1])
     return int(n)
 
 def find_k_from_n(n, max_k=1000, p_values=[0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.2, 0.1]):
-    for k in range(1, max_k + 1):
-        calculated_n = calculate_n_for_k(k, p_values)
-        if calculated_n >= n:
-            return k
-    return None
+    # calculate_n_for_k increases with k, so the smallest k reaching n is found by binary search
+    if calculate_n_for_k(max_k, p_values) < n:
+        return None
+    low, high = 1, max_k
+    while low < high:
+        mid = (low + high) // 2
+        if calculate_n_for_k(mid, p_values) >= n:
+            high = mid
+        else:
+            low = mid + 1
+    return low
 
 # Load the data from the CSV file
 data = pd.read_csv('all_species_lists.csv')
@@ -117,40 +128,20 @@ def create_overlapping_subsets(df, p_values=[0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3,
             print(f"Could not find a valid k for group {group}")
             continue
 
-        # Create subsets
-        subsets = {f"Subset {i}": [] for i in range(1, 11)}
-        start_index = 0  # Start index remains fixed
-
-        # Start with the first subset
-        subsets['Subset 1'] = species_list[start_index:start_index + k]
-        current_position = start_index + k  # Update the current position to move down the list
-
-        for i, p in enumerate(p_values, start=2):
-            # Calculate common and new species
-            common_species = round((2 * k * p) / (1 + p))
-            new_species = k - common_species
-
-            # Select k species starting from start_index + new_species
-            subset_start = start_index + int(new_species)
-            subset_end = subset_start + k
-
-            # Handle wrapping around the species list
-            subset_species = species_list[subset_start:subset_end]
-            if len(subset_species) < k:
-                subset_species += species_list[:k - len(subset_species)]
-
-            subsets[f"Subset {i}"] = subset_species
-
-            # Update the current position for the next subset
-            current_position = subset_start + k
+        # Create subsets: subset 1 starts at the top of the list and every other subset is shifted
+        # down by its number of new species, wrapping around the end of the list
+        new_species = np.array([k - round((2 * k * p) / (1 + p)) for p in p_values], dtype=int)
+        starts = np.concatenate(([0], new_species))
+        indices = (starts[:, None] + np.arange(k)) % n
 
-        # Pad all subsets to ensure they are the same length
-        max_len = len(species_list)
-        for key in subsets:
-            subsets[key] += [None] * (max_len - len(subsets[key]))  # Pad with None values if necessary
+        # All subsets side by side, padded with None to the length of the species list; there are
+        # always at least 10 subset columns, the ones without a p value stay empty
+        n_columns = max(10, len(starts))
+        subsets = np.full((n, n_columns), None, dtype=object)
+        subsets[:k, :len(starts)] = np.array(species_list, dtype=object)[indices].T
 
         # Save as CSV
-        output_df = pd.DataFrame(subsets)
+        output_df = pd.DataFrame(subsets, columns=[f"Subset {i}" for i in range(1, n_columns + 1)])
         output_file = f"{group}_overlapping_subsets.csv"
         output_df.to_csv(output_file, index=False)
         print(f"Saved file for {group}: {output_file}")
@@ -180,6 +171,17 @@ def setup_driver():
     driver = webdriver.Chrome(options=chrome_options)
     return driver
 
+def quit_driver(driver):
+    """
+    Quit the driver if one is running, ignoring a browser that has already crashed.
+    """
+    if driver is not None:
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+    return None
+
 def clean_folder(folder_name):
     """
     Delete all contents in the folder if it exists.
@@ -245,41 +247,49 @@ def submit_tree_request(driver, species_list, email, group):
         print(f"Error during tree request: {str(e)}")
         return None
 
-def download_zipfile_using_job_id(job_id, folder_name, max_retries=20):
+def download_zipfile_using_job_id(job_id, folder_name, max_retries=20, session=None):
     """
     Directly construct the URL from the job ID and download the file, retry up to max_retries if it fails.
+    A shared requests session can be passed to reuse its connections.
     """
+    http = session if session is not None else requests
     download_url = f"https://data.vertlife.org/pruned_treesets/{job_id}/{job_id}.zip"
     print(f"Downloading from: {download_url}")
 
     retries = 0
     while retries < max_retries:
-        response = requests.get(download_url)
+        response = http.get(download_url, stream=True)
 
         if response.status_code == 200:
             zip_filename = os.path.join(folder_name, f"{job_id}.zip")
 
-            # Save the zip file
-            with open(zip_filename, 'wb') as f:
-                f.write(response.content)
+            # Stream the zip file to disk
+            with response, open(zip_filename, 'wb') as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    f.write(chunk)
 
             try:
                 with zipfile.ZipFile(zip_filename, 'r') as zip_ref:
                     print(f"Extracting files from {zip_filename}...")
-                    for file in zip_ref.namelist():
-                        # Rename extracted files using job_id to ensure uniqueness
-                        file_extension = os.path.splitext(file)[1]  # Get the file extension (e.g., .nex)
+                    for info in zip_ref.infolist():
+                        if info.is_dir():
+                            continue
+                        # Name extracted files using job_id to ensure uniqueness
+                        file_extension = os.path.splitext(info.filename)[1]  # Get the file extension (e.g., .nex)
                         new_file_name = f"{job_id}{file_extension}"  # Construct new file name using job_id
                         target_path = os.path.join(folder_name, new_file_name)
 
-                        # Extract and rename the file
-                        zip_ref.extract(file, folder_name)
-                        os.rename(os.path.join(folder_name, file), target_path)
+                        # Extract the file directly under its final name
+                        with zip_ref.open(info) as src, open(target_path, 'wb') as dst:
+                            shutil.copyfileobj(src, dst, 1 << 16)
                         print(f"Extracted: {target_path}")
+                # Only the extracted files are used from here on
+                os.remove(zip_filename)
             except zipfile.BadZipFile:
                 print(f"Error: {zip_filename} is not a valid zip file.")
             return True
         else:
+            response.close()
             retries += 1
             print(f"Failed to download from {download_url}. Status code: {response.status_code}. Retrying... ({retries}/{max_retries})")
             time.sleep(30)
@@ -301,42 +311,54 @@ def automate_process(input_file, email):
     job_ids = {}
 
     # Step 1: Request trees and collect job IDs
-    for subset_name in df.columns:
-        success = False
-        retries = 0
-        while not success and retries < 15:
-            try:
-                print(f"Requesting trees for {subset_name}")
-                species_list = df[subset_name].dropna().tolist()
-                # Initialize the driver for each request
-                driver = setup_driver()
-                job_id = submit_tree_request(driver, species_list, email, group_name)
-                driver.quit()  # Quit the driver after the request
-                if job_id:
-                    job_ids[subset_name] = job_id
-                    success = True
-                else:
-                    print(f"Retrying {subset_name} due to missing job ID.")
+    # The browser is started once and reused for all requests; it is only restarted after a failed attempt
+    driver = None
+    try:
+        for subset_name in df.columns:
+            success = False
+            retries = 0
+            while not success and retries < 15:
+                try:
+                    print(f"Requesting trees for {subset_name}")
+                    species_list = df[subset_name].dropna().tolist()
+                    if driver is None:
+                        driver = setup_driver()
+                    job_id = submit_tree_request(driver, species_list, email, group_name)
+                    if job_id:
+                        job_ids[subset_name] = job_id
+                        success = True
+                    else:
+                        print(f"Retrying {subset_name} due to missing job ID.")
+                        driver = quit_driver(driver)
+                        retries += 1
+                        time.sleep(20)
+                except Exception as e:
+                    print(f"Exception during processing subset {subset_name}: {e}")
+                    driver = quit_driver(driver)
                     retries += 1
                     time.sleep(20)
-            except Exception as e:
-                print(f"Exception during processing subset {subset_name}: {e}")
-                retries += 1
-                time.sleep(20)
 
-        # Wait a bit before the next request
-        time.sleep(10)
+            # Wait a bit before the next request
+            time.sleep(10)
+    finally:
+        quit_driver(driver)
 
     # Added Delay Before Downloading Files
     print("Waiting for 60 seconds before starting downloads to ensure files are ready...")
     time.sleep(60)  # Wait for 60 seconds
 
     # Step 2: Download the results using the job ID
-    for subset_name, job_id in job_ids.items():
-        print(f"Processing download for {subset_name}")
-        download_success = download_zipfile_using_job_id(job_id, folder_name)
-        if not download_success:
-            print(f"Failed to download trees for {subset_name}")
+    # The downloads are independent and network-bound, so they run concurrently (one thread per
+    # subset) over a single session that keeps its connections to the server open
+    with requests.Session() as session, ThreadPoolExecutor(max_workers=10) as executor:
+        session.mount('https://', HTTPAdapter(pool_maxsize=10))
+        downloads = {}
+        for subset_name, job_id in job_ids.items():
+            print(f"Processing download for {subset_name}")
+            downloads[subset_name] = executor.submit(download_zipfile_using_job_id, job_id, folder_name, session=session)
+        for subset_name, download in downloads.items():
+            if not download.result():
+                print(f"Failed to download trees for {subset_name}")
 
 input_file = f"{species_group}_overlapping_subsets.csv"
 automate_process(input_file, email)
@@ -378,18 +400,24 @@ def process_nexus_files(input_dir, output_file, t):
     """
     all_selected_trees = []
 
-    # Loop through all .nex files in the input directory
-    for filename in os.listdir(input_dir):
-        if filename.endswith(".nex"):
-            nexus_file = os.path.join(input_dir, filename)
-            selected_trees = convert_nexus_to_newick(nexus_file, t)
-            all_selected_trees.extend(selected_trees)
+    # All .nex files in the input directory
+    nexus_files = [os.path.join(input_dir, filename) for filename in os.listdir(input_dir) if filename.endswith(".nex")]
+
+    # The files are independent, so they are converted in parallel. Workers are forked because
+    # this script runs at module level and would be re-executed by spawned workers; each worker
+    # reseeds its random generator so that the files are not sampled identically.
+    if "fork" in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("fork").Pool(initializer=random.seed) as pool:
+            converted = pool.map(partial(convert_nexus_to_newick, t=t), nexus_files)
+    else:
+        converted = [convert_nexus_to_newick(nexus_file, t) for nexus_file in nexus_files]
+
+    for selected_trees in converted:
+        all_selected_trees.extend(selected_trees)
 
-    # Save all selected trees into one file without blank lines
+    # Save all selected trees into one file without blank lines, in a single write
     with open(output_file, 'w') as out_file:
-        for tree in all_selected_trees:
-            if tree:  # Ensure no blank lines
-                out_file.write(tree + '\n')
+        out_file.write(''.join(tree + '\n' for tree in all_selected_trees if tree))
 
     print(f"Saved {len(all_selected_trees)} Newick trees to {output_file}")
 
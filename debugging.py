@@ -1,6 +1,10 @@
 #Debugging of the updated version of the k-NCL algorithm
 
+from collections import deque
 from ete3 import Tree
+import logging
+
+log = logging.getLogger(__name__)
 
 # Helper functions
 def precompute_descendants(node, distinct_leaves):
@@ -115,9 +119,9 @@ def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, in
         return True
 
     def bfs(node, accumulated_distance):
-        queue = [(node, accumulated_distance, None, 0, [], False)]
+        queue = deque([(node, accumulated_distance, None, 0, [], False)])
         while queue:
-            current_node, current_dist, prev_node, prev_dist, path, toward_root = queue.pop(0)
+            current_node, current_dist, prev_node, prev_dist, path, toward_root = queue.popleft()
             if current_node in visited_nodes or 'temp' in current_node.name or current_node.name in inserted_leaves:
                 continue
             visited_nodes.add(current_node)
@@ -301,7 +305,7 @@ def kNCL(T1, T2, k):
     if k < 2 or k > len(CL):
         raise ValueError("The value of k must be between 2 and the number of common leaves.")
 
-    print(f"Common Leaves (CL): {CL}")
+    log.debug("Common Leaves (CL): %s", CL)
 
     def adjust_rate(T1, T2):
         sum_T1 = sum(T1.get_distance(l1, l2) for i, l1 in enumerate(CL) for l2 in list(CL)[i + 1:])
@@ -310,12 +314,13 @@ def kNCL(T1, T2, k):
 
     r12 = adjust_rate(T1, T2)  # Adjusting from T2 to T1
     r21 = adjust_rate(T2, T1)  # Adjusting from T1 to T2
-    print(f"Adjustment rates: r12 = {r12}, r21 = {r21}")
+    log.debug("Adjustment rates: r12 = %s, r21 = %s", r12, r21)
 
     SD1 = findSD(T1, set(T1.get_leaf_names()) - CL)
     SD2 = findSD(T2, set(T2.get_leaf_names()) - CL)
-    print(f"Subtrees in T1 (SD1): {[get_subtree_newick_with_branch_lengths(n) for n in SD1]}")
-    print(f"Subtrees in T2 (SD2): {[get_subtree_newick_with_branch_lengths(n) for n in SD2]}")
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Subtrees in T1 (SD1): %s", [get_subtree_newick_with_branch_lengths(n) for n in SD1])
+        log.debug("Subtrees in T2 (SD2): %s", [get_subtree_newick_with_branch_lengths(n) for n in SD2])
 
     inserted_leaves = set()  # Track inserted leaves to ignore them in future iterations
 
@@ -331,33 +336,33 @@ def kNCL(T1, T2, k):
             for node in adjusted_subtree.traverse():
                 node.dist *= rate
 
-            print(f"Processing subtree {a.name} with adjusted branch lengths")
+            log.debug("Processing subtree %s with adjusted branch lengths", a.name)
             NCL = sorted(CL, key=lambda l: source_tree.get_distance(a, source_tree & l))[:k]
-            print(f"Nearest Common Leaves for {a.name}: {NCL}")
+            log.debug("Nearest Common Leaves for %s: %s", a.name, NCL)
             TL = set()
             for lc in NCL:
-                print(f"Checking for leaf {lc} in target_tree")
+                log.debug("Checking for leaf %s in target_tree", lc)
                 if target_tree.search_nodes(name=lc):
                     lc_node = target_tree & lc
                 else:
                     raise ValueError(f"Common leaf '{lc}' not found in target_tree.")
-                print(f"Checking for leaf {lc} in source_tree")
+                log.debug("Checking for leaf %s in source_tree", lc)
                 lc_node_source = source_tree & lc
                 rc = sum(target_tree.get_distance(lc_node, l) for l in CL) / sum(source_tree.get_distance(lc_node_source, l) for l in CL)
-                print('Leaf-based rate: ', rc)
+                log.debug("Leaf-based rate: %s", rc)
                 dp = (source_tree.get_distance(a, lc_node_source) - a.dist) * rc
-                print(f"Inserting temporary leaves for {a.name} from leaf {lc} at distance {dp}")
+                log.debug("Inserting temporary leaves for %s from leaf %s at distance %s", a.name, lc, dp)
                 temp_leaves = InsertTempLeaves(target_tree, lc, "temp", adjusted_subtree.dist, dp, inserted_leaves)
-                print(f"Temporary leaves after insertion for {lc}: {temp_leaves}")
+                log.debug("Temporary leaves after insertion for %s: %s", lc, temp_leaves)
                 TL.update(temp_leaves)
                 inserted_leaves.update(temp_leaves)  # Add the inserted leaves to the set
 
-            print(f"Temporary leaves for {a.name}: {TL}")
-            print("Tree after inserting temporary leaves:")
-            print(target_tree.write(format=1))
+            log.debug("Temporary leaves for %s: %s", a.name, TL)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Tree after inserting temporary leaves:\n%s", target_tree.write(format=1))
 
             if not TL:
-                print(f"No temporary leaves were inserted for {a.name}")
+                log.debug("No temporary leaves were inserted for %s", a.name)
                 continue
 
             if len(TL) == 1:
@@ -373,39 +378,39 @@ def kNCL(T1, T2, k):
                 adjusted_subtree.dist = branch_length
                 parent.add_child(adjusted_subtree)
 
-                print(f"Only one temporary leaf, inserted subtree {a.name}")
+                log.debug("Only one temporary leaf, inserted subtree %s", a.name)
             else:
                 try:
                     prev_node, curr_node, excess, _, original_dist = compute_midpoint(target_tree, TL)
-                    print(f"Inserting midpoint and new subtree for {a.name} between {prev_node.name} and {curr_node.name}")
-                    print(f"Midpoint insertion details - Excess: {excess}, Original Dist: {original_dist}")
+                    log.debug("Inserting midpoint and new subtree for %s between %s and %s", a.name, prev_node.name, curr_node.name)
+                    log.debug("Midpoint insertion details - Excess: %s, Original Dist: %s", excess, original_dist)
                     target_tree = insert_midpoint_and_new_subtree(target_tree, prev_node, curr_node, excess, adjusted_subtree, adjusted_subtree.dist, original_dist)
                 except Exception as e:
-                    print("Error encountered during midpoint insertion:")
-                    print(f"Nodes involved: {TL}")
-                    print(f"Error: {str(e)}")
+                    log.error("Error encountered during midpoint insertion: %s (nodes involved: %s)", e, TL)
 
             target_tree = remove_temporary_leaves(target_tree, TL)
-            print(f"Inserted midpoint and new subtree for {a.name}")
-            print(f"Tree after removing temporary leaves:")
-            print(target_tree.write(format=1))
+            log.debug("Inserted midpoint and new subtree for %s", a.name)
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Tree after removing temporary leaves:\n%s", target_tree.write(format=1))
         return target_tree
 
     # Process trees with the corrected adjustment rates
     T1_completed = process_tree(T1, T2, SD2, r12, k)
-    print("Intermediate T1 completed tree state:")
-    print(T1_completed.write(format=1))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Intermediate T1 completed tree state:\n%s", T1_completed.write(format=1))
 
     T2_completed = process_tree(T2, T1, SD1, r21, k)
-    print("Intermediate T2 completed tree state:")
-    print(T2_completed.write(format=1))
+    if log.isEnabledFor(logging.DEBUG):
+        log.debug("Intermediate T2 completed tree state:\n%s", T2_completed.write(format=1))
 
     clear_internal_node_names(T1_completed)
     clear_internal_node_names(T2_completed)
 
     return T1_completed, T2_completed
 
-# Test example
+# Test example, traced at DEBUG level; raise the level to silence the intermediate states
+logging.basicConfig(level=logging.DEBUG, format="%(message)s")
+
 newick1 = "((A:0.597,B:0.139):0.735,((C:0.171,E:0.069):0.218,(Q:0.138,D:0.077):0.343):0.609);"
 newick2 = "(((A:1.587,(F:1.110,(M:1.343,R:1.369):0.846):0.487):1.981,D:0.356):2.121,(B:1.936,(C:0.915,Q:1.201):2.101):0.912);"
 
@@ -1,66 +1,95 @@
 # Please note that this version is not final and is under development
 
 import argparse
+from BSD_distance.bsd import calculate_pairwise_distances, postorder
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from ete3 import Tree
+import heapq
 import math
-from itertools import combinations
+import numpy as np
 
 # Helper functions
-def precompute_descendants(node, distinct_leaves):
+def precompute_descendants(node, distinct_leaves, all_distinct):
+    # Adds node to all_distinct once its children have been visited
     if node.is_leaf():
-        node.add_feature("descendants_distinct", node.name in distinct_leaves)
-    else:
-        all_distinct = True
-        for child in node.children:
-            if not child.descendants_distinct:
-                all_distinct = False
-                break
-        node.add_feature("descendants_distinct", all_distinct)
+        if node.name in distinct_leaves:
+            all_distinct.add(node)
+    elif all_distinct.issuperset(node.children):
+        # issuperset stops at the first child that is not all-distinct
+        all_distinct.add(node)
 
 def findSD(tree, distinct_leaves):
-    for node in tree.traverse("postorder"):
-        precompute_descendants(node, distinct_leaves)
-
+    # Maximal roots are the all-distinct children of a node that is not all-distinct
+    all_distinct = set()
     subtree_roots = set()
-    visited_leaves = set()
-
-    for leaf_name in distinct_leaves:
-        if leaf_name in visited_leaves:
-            continue
-
-        leaf_node = tree & leaf_name
-        current_node = leaf_node
-        subtree_root = None
-
-        while current_node:
-            if current_node.descendants_distinct:
-                subtree_root = current_node
-            current_node = current_node.up
-
-        if subtree_root and subtree_root not in subtree_roots:
-            subtree_roots.add(subtree_root)
-            visited_leaves.update(get_leaves(subtree_root))
+    for node in postorder(tree):
+        precompute_descendants(node, distinct_leaves, all_distinct)
+        if node not in all_distinct:
+            subtree_roots.update(child for child in node.children if child in all_distinct)
+    if tree in all_distinct:
+        subtree_roots.add(tree)
 
     return subtree_roots
 
-def get_leaves(node):
-    return set(leaf.name for leaf in node)
+def leaf_distances_from(node):
+    # Distances from node to every leaf of its tree in a single traversal
+    distances = {}
+    stack = [(node, None, 0.0)]
+    while stack:
+        current, came_from, current_dist = stack.pop()
+        if current.is_leaf():
+            distances[current.name] = current_dist
+        for child in current.children:
+            if child is not came_from:
+                stack.append((child, current, current_dist + child.dist))
+        if current.up is not None and current.up is not came_from:
+            stack.append((current.up, current, current_dist + current.dist))
+    return distances
+
+def leaf_distance_sum(leaf, common_leaves):
+    # Summed distance from leaf to all common leaves of its tree
+    distances = leaf_distances_from(leaf)
+    return sum(distances[name] for name in common_leaves)
+
+def leaf_rate(target_leaf, source_sum, common_leaves):
+    # Ratio of the summed distances from a common leaf to all common leaves in both trees
+    if not source_sum:
+        return 1
+    return leaf_distance_sum(target_leaf, common_leaves) / source_sum
 
 def get_subtree_newick_with_branch_lengths(node):
     return node.write(format=1)
 
-def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, inserted_leaves, tolerance=1e-10):
-    # Operate directly on 'tree'
-    target_node = tree.search_nodes(name=target_leaf)[0]
-    insertion_points = []
-    visited_nodes = set()
-
-    # Label internal nodes and branches for easier tracking
-    internal_node_counter = 1
-    for node in tree.traverse("postorder"):
+def _link(parent, child, dist):
+    # add_child without the optional-argument handling, for the insertion hot paths
+    parent.children.append(child)
+    child.up = parent
+    child.dist = dist
+    return child
+
+def _unlink(child):
+    child.up.children.remove(child)
+    child.up = None
+
+def label_internal_nodes(tree):
+    # Label internal nodes once per tree; later insertions continue from tree.internal_node_counter
+    internal_node_counter = 0
+    for node in postorder(tree):
         if not node.is_leaf() and not node.name:
-            node.name = f"Node{internal_node_counter}"
             internal_node_counter += 1
+            node.name = f"Node{internal_node_counter}"
+    tree.internal_node_counter = internal_node_counter
+
+def add_internal_node(tree, parent, dist):
+    tree.internal_node_counter += 1
+    return _link(parent, Tree(name=f"Node{tree.internal_node_counter}"), dist)
+
+def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, inserted_leaves, leaf_index, tolerance=1e-10):
+    # leaf_index maps the leaf names of 'tree' to their nodes, temporary leaves included
+    target_node = leaf_index[target_leaf]
+    insertion_points = []
+    visited_nodes = set()
 
     def robust_insert_leaf_at_node(current_node, insert_distance, previous_node, original_branch_distance, toward_root=False):
         # Swap current_node and previous_node if moving towards the root
@@ -77,20 +106,19 @@ def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, in
         if dist_to_previous_node < 0:
             dist_to_previous_node = 0
 
-        # Detach previous_node from its parent
         parent = previous_node.up
-        if parent:
-            parent.remove_child(previous_node)
+        if parent is None:
+            # The root has no branch above it: hang the leaf from the root so it never becomes its own ancestor
+            new_internal_node = previous_node
         else:
-            parent = tree  # previous_node is root
-
-        # Create new internal node
-        new_internal_node = parent.add_child(dist=dist_to_parent)
-        new_internal_node.add_child(previous_node, dist=dist_to_previous_node)
+            # Detach previous_node from its parent and create new internal node
+            _unlink(previous_node)
+            new_internal_node = add_internal_node(tree, parent, dist_to_parent)
+            _link(new_internal_node, previous_node, dist_to_previous_node)
 
         # Add temporary leaf
         new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-        new_internal_node.add_child(name=new_leaf_name, dist=new_length)
+        leaf_index[new_leaf_name] = _link(new_internal_node, Tree(name=new_leaf_name), new_length)
         insertion_points.append(new_leaf_name)
         visited_nodes.add(new_internal_node)
 
@@ -105,11 +133,11 @@ def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, in
 
         parent = current_node.up
         if parent:
-            current_node.detach()
-            new_internal_node = parent.add_child(dist=excess_length)
-            new_internal_node.add_child(current_node, dist=insert_distance)
+            _unlink(current_node)
+            new_internal_node = add_internal_node(tree, parent, excess_length)
+            _link(new_internal_node, current_node, insert_distance)
             new_leaf_name = f"{target_leaf}_{new_leaf_base_name}{len(insertion_points) + 1}"
-            new_internal_node.add_child(name=new_leaf_name, dist=new_length)
+            leaf_index[new_leaf_name] = _link(new_internal_node, Tree(name=new_leaf_name), new_length)
             insertion_points.append(new_leaf_name)
             visited_nodes.add(new_internal_node)
         else:
@@ -118,16 +146,18 @@ def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, in
         return True
 
     def bfs(node, accumulated_distance):
-        queue = [(node, accumulated_distance, None, 0, [], False)]
+        dist_rounded = round(dist, 8)
+        queue = deque([(node, accumulated_distance, None, 0, False)])
         while queue:
-            current_node, current_dist, prev_node, prev_dist, path, toward_root = queue.pop(0)
+            current_node, current_dist, prev_node, prev_dist, toward_root = queue.popleft()
             if current_node in visited_nodes or 'temp' in current_node.name or current_node.name in inserted_leaves:
                 continue
             visited_nodes.add(current_node)
-            current_path = path + [current_node.name]
 
-            if round(current_dist, 8) >= dist:
-                insert_distance = round(current_dist, 8) - round(dist, 8)
+            # Distances are compared at 8 decimals; dist is rounded once per walk
+            current_rounded = round(current_dist, 8)
+            if current_rounded >= dist:
+                insert_distance = current_rounded - dist_rounded
                 if abs(insert_distance) < tolerance:
                     insert_distance = 0
                 if insert_distance == 0:
@@ -143,10 +173,10 @@ def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, in
 
             for child in current_node.children:
                 if child not in visited_nodes and child.name not in inserted_leaves:
-                    queue.append((child, current_dist + child.dist, current_node, child.dist, current_path, False))
+                    queue.append((child, current_dist + child.dist, current_node, child.dist, False))
 
             if current_node.up and current_node.up not in visited_nodes and current_node.up.name not in inserted_leaves:
-                queue.append((current_node.up, current_dist + current_node.dist, current_node, current_node.dist, current_path, True))
+                queue.append((current_node.up, current_dist + current_node.dist, current_node, current_node.dist, True))
 
     if dist <= target_node.dist:
         insert_leaf_at_terminal(target_node, dist)
@@ -155,58 +185,83 @@ def InsertTempLeaves(tree, target_leaf, new_leaf_base_name, new_length, dist, in
 
     return insertion_points  # Return names instead of node objects
 
-def find_farthest_leaf(tree, start, temporary_leaves):
-    max_distance = 0
-    farthest_leaf = start
-    for leaf_name in temporary_leaves:
-        if leaf_name != start.name:
-            leaf = tree & leaf_name
-            distance = tree.get_distance(start, leaf)
-            if distance > max_distance:
-                max_distance = distance
-                farthest_leaf = leaf
-    return farthest_leaf, max_distance
-
-def find_path(leaf1, leaf2):
-    path1 = []
-    node = leaf1
-    while node:
-        path1.append(node)
-        node = node.up
-
-    path2 = []
-    node = leaf2
-    while node:
-        path2.append(node)
+def find_farthest_pair(leaf_index, temporary_leaves):
+    # Tree diameter over the temporary leaves in one bottom-up pass
+    leaves = [leaf_index[name] for name in temporary_leaves]
+    spanned = set()
+    for leaf in leaves:
+        node = leaf
+        while node is not None and node not in spanned:
+            spanned.add(node)
+            node = node.up
+    root = leaves[0]
+    while root.up:
+        root = root.up
+
+    preorder = []
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        preorder.append(node)
+        stack.extend(child for child in node.children if child in spanned)
+
+    farthest_below = {}
+    max_distance, leaf1, leaf2 = 0, leaves[0], leaves[0]
+    for node in reversed(preorder):
+        if node.is_leaf():
+            farthest_below[node] = (0.0, node)
+            continue
+        first = second = None
+        for child in node.children:
+            if child in farthest_below:
+                distance, leaf = farthest_below[child]
+                candidate = (distance + child.dist, leaf)
+                if first is None or candidate[0] > first[0]:
+                    first, second = candidate, first
+                elif second is None or candidate[0] > second[0]:
+                    second = candidate
+        if second is not None and first[0] + second[0] > max_distance:
+            max_distance, leaf1, leaf2 = first[0] + second[0], first[1], second[1]
+        farthest_below[node] = first
+    return leaf1, leaf2, max_distance
+
+def node_depth(node):
+    depth = 0
+    while node.up:
         node = node.up
+        depth += 1
+    return depth
 
-    lca = None
-    for n1 in path1:
-        if n1 in path2:
-            lca = n1
-            break
+def find_path(leaf1, leaf2):
+    # Lift the deeper leaf to the same depth, then both until they meet at the LCA
+    depth1 = node_depth(leaf1)
+    depth2 = node_depth(leaf2)
 
     path = []
-    branch_lengths = []
-    for node in path1:
-        path.append(node)
-        if node == lca:
-            break
-
-    lca_index = path2.index(lca)
-    reversed_path2 = list(reversed(path2[:lca_index]))
-    path.extend(reversed_path2)
-
-    for i in range(1, len(path)):
-        branch_lengths.append(path[i - 1].get_distance(path[i]))
+    path2 = []
+    node1, node2 = leaf1, leaf2
+    while depth1 > depth2:
+        path.append(node1)
+        node1 = node1.up
+        depth1 -= 1
+    while depth2 > depth1:
+        path2.append(node2)
+        node2 = node2.up
+        depth2 -= 1
+    while node1 is not node2:
+        path.append(node1)
+        path2.append(node2)
+        node1 = node1.up
+        node2 = node2.up
+    branch_lengths = [node.dist for node in path]
+    branch_lengths.extend(node.dist for node in reversed(path2))
+    path.append(node1)
+    path.extend(reversed(path2))
 
     return path, branch_lengths
 
-def compute_midpoint(tree, temporary_leaves):
-    start_name = next(iter(temporary_leaves))
-    start = tree & start_name
-    leaf1, dist1 = find_farthest_leaf(tree, start, temporary_leaves)
-    leaf2, dist2 = find_farthest_leaf(tree, leaf1, temporary_leaves)
+def compute_midpoint(leaf_index, temporary_leaves):
+    leaf1, leaf2, dist2 = find_farthest_pair(leaf_index, temporary_leaves)
     path, branch_lengths = find_path(leaf1, leaf2)
     total_distance = dist2
     half_distance = round(total_distance / 2, 8)
@@ -225,14 +280,14 @@ def compute_midpoint(tree, temporary_leaves):
             return prev_node, node, 0, half_distance, branch_lengths[i - 1]
 
 def insert_midpoint_and_new_subtree(tree, prev_node, curr_node, excess, subtree, branch_length, original_dist):
+    # subtree is attached as is: the caller passes a copy it does not use afterwards
     if excess == 0:
         # Attach the subtree directly to curr_node
-        new_subtree = subtree.copy()
-        new_subtree.dist = branch_length
-        curr_node.add_child(new_subtree)
+        _link(curr_node, subtree, branch_length)
         return tree
 
-    if curr_node in prev_node.get_ancestors():
+    curr_is_parent = prev_node.up is curr_node
+    if curr_is_parent:
         distance_to_midpoint = round(excess, 8)
         distance_from_midpoint_to_leaf = round(original_dist - excess, 8)
     else:
@@ -242,29 +297,23 @@ def insert_midpoint_and_new_subtree(tree, prev_node, curr_node, excess, subtree,
     if distance_to_midpoint < 0 or distance_from_midpoint_to_leaf < 0:
         raise ValueError("Negative distance encountered. Check the calculation logic.")
 
-    new_node = Tree()
-    new_node.dist = distance_to_midpoint
-
-    if curr_node in prev_node.get_ancestors():
+    if curr_is_parent:
         parent = prev_node.up
         child = prev_node
     else:
         parent = prev_node
         child = curr_node
 
-    parent.remove_child(child)
-    parent.add_child(new_node)
-    new_node.add_child(child)
-    child.dist = distance_from_midpoint_to_leaf
+    _unlink(child)
+    new_node = add_internal_node(tree, parent, distance_to_midpoint)
+    _link(new_node, child, distance_from_midpoint_to_leaf)
 
     # Now add the subtree
-    new_subtree = subtree.copy()
-    new_subtree.dist = branch_length
-    new_node.add_child(new_subtree)
+    _link(new_node, subtree, branch_length)
 
     return tree
 
-def remove_temporary_leaves(tree, temporary_leaves):
+def remove_temporary_leaves(tree, temporary_leaves, leaf_index):
     def collapse_single_child_nodes(node):
         while not node.is_leaf() and len(node.children) == 1:
             child = node.children[0]
@@ -280,9 +329,8 @@ def remove_temporary_leaves(tree, temporary_leaves):
                 tree = child  # Update tree reference
                 node = child
     for leaf_name in temporary_leaves:
-        leaf_nodes = tree.search_nodes(name=leaf_name)
-        if leaf_nodes:
-            leaf = leaf_nodes[0]
+        leaf = leaf_index.pop(leaf_name, None)
+        if leaf is not None:
             parent = leaf.up
             if parent:
                 parent.remove_child(leaf)
@@ -298,26 +346,32 @@ def clear_internal_node_names(tree):
             node.name = ''
 
 def kNCL(T1, T2, k):
-    CL = set(T1.get_leaf_names()) & set(T2.get_leaf_names())
+    # Leaf nodes survive the insertions, so each tree is indexed once
+    leaf_index1 = {leaf.name: leaf for leaf in T1.iter_leaves()}
+    leaf_index2 = {leaf.name: leaf for leaf in T2.iter_leaves()}
+    CL = set(leaf_index1) & set(leaf_index2)
     if len(CL) < 3:
         raise ValueError("The input trees must have at least 3 common leaves.")
     if k < 2 or k > len(CL):
         raise ValueError("The value of k must be between 2 and the number of common leaves.")
 
-    def adjust_rate(T1, T2):
-        sum_T1 = sum(T1.get_distance(l1, l2) for i, l1 in enumerate(CL) for l2 in list(CL)[i + 1:])
-        sum_T2 = sum(T2.get_distance(l1, l2) for i, l1 in enumerate(CL) for l2 in list(CL)[i + 1:])
-        return sum_T1 / sum_T2 if sum_T2 else 1
+    # Distances between the common leaves of each tree, computed once in a single pass per tree
+    _, D1 = calculate_pairwise_distances(T1, CL)
+    _, D2 = calculate_pairwise_distances(T2, CL)
 
-    r12 = adjust_rate(T1, T2)  # Adjusting from T2 to T1
-    r21 = adjust_rate(T2, T1)  # Adjusting from T1 to T2
+    # Each pair counts twice in the symmetric matrices, which cancels out in the ratio
+    total1 = float(D1.sum())
+    total2 = float(D2.sum())
+    r12 = total1 / total2 if total2 else 1  # Adjusting from T2 to T1
+    r21 = total2 / total1 if total1 else 1  # Adjusting from T1 to T2
 
-    SD1 = findSD(T1, set(T1.get_leaf_names()) - CL)
-    SD2 = findSD(T2, set(T2.get_leaf_names()) - CL)
+    SD1 = findSD(T1, set(leaf_index1) - CL)
+    SD2 = findSD(T2, set(leaf_index2) - CL)
 
     inserted_leaves = set()  # Track inserted leaves to ignore them in future iterations
 
-    def process_tree(target_tree, source_tree, subtrees_to_insert, rate, k):
+    def process_tree(target_tree, source_tree, target_index, source_index, subtrees_to_insert, rate, k):
+        source_sums = {}  # The source tree does not change while the target tree is completed
         for a in subtrees_to_insert:
             if not a.name:
                 a.name = "subtree_" + str(len(subtrees_to_insert))  # Assign a name to unnamed subtrees
@@ -329,17 +383,18 @@ def kNCL(T1, T2, k):
             for node in adjusted_subtree.traverse():
                 node.dist *= rate
 
-            NCL = sorted(CL, key=lambda l: source_tree.get_distance(a, source_tree & l))[:k]
+            distances_a = leaf_distances_from(a)
+            NCL = heapq.nsmallest(k, CL, key=distances_a.__getitem__)
             TL = set()
             for lc in NCL:
-                if target_tree.search_nodes(name=lc):
-                    lc_node = target_tree & lc
-                else:
+                if lc not in target_index:
                     raise ValueError(f"Common leaf '{lc}' not found in target_tree.")
-                lc_node_source = source_tree & lc
-                rc = sum(target_tree.get_distance(lc_node, l) for l in CL) / sum(source_tree.get_distance(lc_node_source, l) for l in CL)
-                dp = (source_tree.get_distance(a, lc_node_source) - a.dist) * rc
-                temp_leaves = InsertTempLeaves(target_tree, lc, "temp", adjusted_subtree.dist, dp, inserted_leaves)
+                if lc not in source_sums:
+                    source_sums[lc] = leaf_distance_sum(source_index[lc], CL)
+                # Insertions change the target's branch lengths, so its side is taken on the current tree
+                rc = leaf_rate(target_index[lc], source_sums[lc], CL)
+                dp = (distances_a[lc] - a.dist) * rc
+                temp_leaves = InsertTempLeaves(target_tree, lc, "temp", adjusted_subtree.dist, dp, inserted_leaves, target_index)
                 TL.update(temp_leaves)
                 inserted_leaves.update(temp_leaves)  # Add the inserted leaves to the set
 
@@ -349,7 +404,7 @@ def kNCL(T1, T2, k):
 
             if len(TL) == 1:
                 single_leaf_name = next(iter(TL))
-                single_leaf = target_tree & single_leaf_name
+                single_leaf = target_index.pop(single_leaf_name)
                 parent = single_leaf.up
                 branch_length = single_leaf.dist
 
@@ -362,20 +417,23 @@ def kNCL(T1, T2, k):
 
             else:
                 try:
-                    prev_node, curr_node, excess, _, original_dist = compute_midpoint(target_tree, TL)
+                    prev_node, curr_node, excess, _, original_dist = compute_midpoint(target_index, TL)
                     target_tree = insert_midpoint_and_new_subtree(target_tree, prev_node, curr_node, excess, adjusted_subtree, adjusted_subtree.dist, original_dist)
                 except Exception as e:
                     print("Error encountered during midpoint insertion:")
                     print(f"Nodes involved: {TL}")
                     print(f"Error: {str(e)}")
 
-            target_tree = remove_temporary_leaves(target_tree, TL)
+            target_tree = remove_temporary_leaves(target_tree, TL, target_index)
         return target_tree
 
+    label_internal_nodes(T1)
+    label_internal_nodes(T2)
+
     # Process trees with the corrected adjustment rates
-    T1_completed = process_tree(T1, T2, SD2, r12, k)
+    T1_completed = process_tree(T1, T2, leaf_index1, leaf_index2, SD2, r12, k)
 
-    T2_completed = process_tree(T2, T1, SD1, r21, k)
+    T2_completed = process_tree(T2, T1, leaf_index2, leaf_index1, SD1, r21, k)
 
     clear_internal_node_names(T1_completed)
     clear_internal_node_names(T2_completed)
@@ -389,22 +447,23 @@ def parse_input_file(input_file):
     return trees
 
 def write_output_file(output_file, results):
+    # One write for the whole output instead of one per tree pair
     with open(output_file, 'w') as file:
-        for result in results:
-            file.write(result + '\n')
+        file.write(''.join(result + '\n' for result in results))
 
 def squared_distance_sum(t1, t2, leaves):
-    sum_sq_distance = 0
-    for leaf1, leaf2 in combinations(leaves, 2):
-        d1 = t1.get_distance(leaf1, leaf2)
-        d2 = t2.get_distance(leaf1, leaf2)
-        sum_sq_distance += (d1 - d2) ** 2
-    return sum_sq_distance
-
-def BSD(T1, T2, k):
-    # Get the leaves from the original input trees (before completion)
-    leaves1 = set(leaf.name for leaf in T1.get_leaves())
-    leaves2 = set(leaf.name for leaf in T2.get_leaves())
+    # Every pair is counted twice in the symmetric difference matrix
+    _, d1 = calculate_pairwise_distances(t1, leaves)
+    _, d2 = calculate_pairwise_distances(t2, leaves)
+    d1 -= d2
+    return float(np.vdot(d1, d1)) / 2
+
+def BSD(T1, T2, k, leaves1=None, leaves2=None):
+    # Get the leaves from the original input trees (before completion), unless the caller already has them
+    if leaves1 is None:
+        leaves1 = set(T1.get_leaf_names())
+    if leaves2 is None:
+        leaves2 = set(T2.get_leaf_names())
 
     # Find the common leaves between the two original trees
     common_leaves = leaves1.intersection(leaves2)
@@ -419,7 +478,7 @@ def BSD(T1, T2, k):
     T1_completed, T2_completed = kNCL(T1_copy, T2_copy, k)
 
     # Get the leaves of the completed trees
-    leaves_completed = set(leaf.name for leaf in T1_completed.get_leaves())
+    leaves_completed = set(T1_completed.iter_leaf_names())
 
     # Calculate BSD(+) over the completed trees and the leafset of T1_completed
     bsd_plus = math.sqrt(squared_distance_sum(T1_completed, T2_completed, leaves_completed))
@@ -430,11 +489,33 @@ def BSD(T1, T2, k):
     # Return BSD distances and the completed trees in Newick format
     return bsd_plus, bsd_minus, T1_completed.write(format=1), T2_completed.write(format=1)
 
+# Input trees shared by all the pairs of a process, set once by init_worker
+_trees = None
+_leaf_sets = None
+_k = None
+
+def init_worker(trees, leaf_sets, k):
+    # Each worker receives the trees once, instead of once per pair
+    global _trees, _leaf_sets, _k
+    _trees, _leaf_sets, _k = trees, leaf_sets, k
+
+def process_pair(pair):
+    # Run the k-NCL algorithm and calculate BSD for one pair of trees
+    i, j = pair
+    bsd_plus, bsd_minus, T1_completed_newick, T2_completed_newick = BSD(_trees[i], _trees[j], _k, _leaf_sets[i], _leaf_sets[j])
+    if bsd_plus is not None and bsd_minus is not None:
+        return (f"Tree pair {i + 1} and {j + 1}:\n"
+                f"BSD(+) = {bsd_plus:.4f}, BSD(-) = {bsd_minus:.4f}\n"
+                f"Completed Tree 1:\n{T1_completed_newick}\n"
+                f"Completed Tree 2:\n{T2_completed_newick}")
+    return f"Tree pair {i + 1} and {j + 1}: Tree completion cannot be performed on these trees. Check their common leaves."
+
 def main():
     parser = argparse.ArgumentParser(description="Run k-NCL algorithm on Newick trees.")
     parser.add_argument('-i', '--input', type=str, required=True, help="Input file with trees in Newick format")
     parser.add_argument('k', type=int, help="Integer value of k for k-NCL algorithm")
     parser.add_argument('-o', '--output', type=str, required=True, help="Output file to save results")
+    parser.add_argument('-p', '--processes', type=int, default=None, help="Number of worker processes (default: number of CPUs)")
 
     args = parser.parse_args()
 
@@ -443,21 +524,18 @@ def main():
     if len(trees) < 2:
         raise ValueError("The input file must contain at least two trees.")
 
-    # Run the k-NCL algorithm and calculate BSD for each pair of trees
-    results = []
-    for i in range(len(trees)):
-        for j in range(i + 1, len(trees)):
-            T1 = trees[i]
-            T2 = trees[j]
-            bsd_plus, bsd_minus, T1_completed_newick, T2_completed_newick = BSD(T1, T2, args.k)
-            if bsd_plus is not None and bsd_minus is not None:
-                result = (f"Tree pair {i + 1} and {j + 1}:\n"
-                          f"BSD(+) = {bsd_plus:.4f}, BSD(-) = {bsd_minus:.4f}\n"
-                          f"Completed Tree 1:\n{T1_completed_newick}\n"
-                          f"Completed Tree 2:\n{T2_completed_newick}")
-                results.append(result)
-            else:
-                results.append(f"Tree pair {i + 1} and {j + 1}: Tree completion cannot be performed on these trees. Check their common leaves.")
+    # Each tree takes part in several pairs, so its leaf set is computed once
+    leaf_sets = [frozenset(tree.get_leaf_names()) for tree in trees]
+
+    # Tree pairs are independent, so they are processed in parallel; map keeps the input order
+    pairs = [(i, j) for i in range(len(trees)) for j in range(i + 1, len(trees))]
+    if len(pairs) == 1 or args.processes == 1:
+        init_worker(trees, leaf_sets, args.k)
+        results = list(map(process_pair, pairs))
+    else:
+        with ProcessPoolExecutor(max_workers=args.processes, initializer=init_worker,
+                                 initargs=(trees, leaf_sets, args.k)) as executor:
+            results = list(executor.map(process_pair, pairs))
 
     # Write the output to a file
     write_output_file(args.output, results)
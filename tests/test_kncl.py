@@ -0,0 +1,26 @@
+from ete3 import Tree
+
+from kncl import InsertTempLeaves, label_internal_nodes
+
+
+def test_exact_hit_at_root_hangs_leaf_from_root():
+    # A is exactly 2 away from the root: the walk ends on the root itself
+    tree = Tree("((A:1,B:1):1,(C:1,D:1):1);", format=1)
+    label_internal_nodes(tree)
+    leaf_index = {leaf.name: leaf for leaf in tree.iter_leaves()}
+
+    temp_leaves = InsertTempLeaves(tree, "A", "temp", 0.5, 2.0, set(), leaf_index)
+
+    assert "A_temp2" in temp_leaves
+    assert leaf_index["A_temp2"].up is tree
+    assert tree.up is None
+    # Every node reaches the root, there is no cycle in the parent pointers
+    size = len(list(tree.traverse()))
+    for node in tree.traverse():
+        steps = 0
+        while node.up is not None:
+            node = node.up
+            steps += 1
+            assert steps < size
+        assert node is tree
+    assert tree.get_distance("A", "C") == 4
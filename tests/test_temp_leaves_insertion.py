@@ -0,0 +1,26 @@
+from ete3 import Tree
+
+from auxiliary_functions.temp_leaves_insertion import insert_leaf_from_target, insert_leaves_from_targets
+
+NEWICK = "((A:1,B:1):1,(C:1,D:1):1);"
+ORIGINAL_LEAVES = ["A", "B", "C", "D"]
+
+
+def test_batch_does_not_walk_into_earlier_temporary_leaves():
+    insertions = [("A", "x", 0.5, 1.0), ("B", "y", 0.5, 1.4)]
+    batch = insert_leaves_from_targets(Tree(NEWICK, format=1), insertions)
+
+    # Each temporary leaf sits where a single insertion on its own copy puts it
+    for insertion in insertions:
+        single = insert_leaf_from_target(Tree(NEWICK, format=1), *insertion)
+        for leaf in single.iter_leaves():
+            if leaf.name in ORIGINAL_LEAVES:
+                continue
+            for original in ORIGINAL_LEAVES:
+                assert abs(batch.get_distance(leaf.name, original) - single.get_distance(leaf.name, original)) < 1e-8
+
+    # No temporary leaf hangs off another one
+    temporary = set(batch.get_leaf_names()) - set(ORIGINAL_LEAVES)
+    for name in temporary:
+        siblings = (batch & name).up.children
+        assert not any(sibling.name in temporary and sibling.name != name for sibling in siblings)